@@ -0,0 +1,12 @@
+import os
+import uvicorn
+
+if __name__ == "__main__":
+    uvicorn.run(
+        "sandbox:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "5000")),
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WORKERS", min(os.cpu_count() or 1, 4)))
+    )
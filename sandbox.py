@@ -1,21 +1,31 @@
 import docker
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, computed_field, field_validator
 import logging
 import os
-import subprocess
-import requests
+import asyncio
+import httpx
 from typing import List, Optional
 from enum import Enum
 from fastapi.middleware.cors import CORSMiddleware
-import json
+from fastapi.responses import ORJSONResponse
+from fastapi.concurrency import run_in_threadpool
+import orjson
+import time
+import re
+import threading
+from collections import OrderedDict
+from functools import cached_property
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Natural language endpoint (needs Ollama); set ENABLE_NL=0 to serve only direct execution
+ENABLE_NL = os.getenv("ENABLE_NL", "1") == "1"
+
 # Create the FastAPI app instance first
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Then add middleware
 app.add_middleware(
@@ -26,6 +36,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+def ensure_projects_dir():
+    """Create the projects directory once instead of on every request"""
+    try:
+        os.makedirs("/app/projects", exist_ok=True)
+    except OSError as e:
+        logger.warning(f"Could not create projects directory: {str(e)}")
+
 class CommandType(str, Enum):
     PYTHON = "python"
     SHELL = "shell"
@@ -36,33 +54,185 @@ class CommandRequest(BaseModel):
     commands: List[str]
     work_dir: Optional[str] = "/app/projects"
 
+    @computed_field
+    @cached_property
+    def command_str(self) -> str:
+        """Commands chained into a single invocation"""
+        return " && ".join(self.commands)
+
+class BatchRequest(BaseModel):
+    requests: List[CommandRequest]
+
 class NLCommandRequest(BaseModel):
     command: str
     work_dir: Optional[str] = "/app/projects"
 
+class InterpretedCommand(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    
+    command_type: CommandType
+    commands: List[str] = Field(min_length=1)
+    explanation: str = "Executing the specified commands"
+    
+    @field_validator("explanation", mode="before")
+    @classmethod
+    def default_missing_explanation(cls, value):
+        return "Executing the specified commands" if value is None else value
+
 class CommandResponse(BaseModel):
     interpreted_commands: List[str]
     command_type: CommandType
     status: str
     output: str
 
-# Initialize docker client
-try:
-    socket_path = os.environ.get('DOCKER_HOST', 'unix:///var/run/docker.sock')
-    logger.info(f"Connecting to Docker at: {socket_path}")
-    client = docker.DockerClient(base_url=socket_path)
-    docker_socket = socket_path
-    version = client.version()
-    logger.info(f"Successfully connected to Docker at {socket_path}")
-except Exception as e:
-    logger.error(f"Failed to connect to Docker: {str(e)}")
-    client = None
-    docker_socket = None
-
-def get_command_interpretation(natural_command: str) -> dict:
-    """Use Ollama to interpret natural language commands into terminal commands"""
+# Docker client is connected on first use rather than at import, and dropped
+# after a failure so the next request reconnects
+docker_socket = os.environ.get('DOCKER_HOST', 'unix:///var/run/docker.sock')
+client = None
+docker_version = None
+_docker_lock = threading.Lock()
+
+def get_client() -> Optional[docker.DockerClient]:
+    """Return the shared Docker client, connecting if needed; None if Docker is unreachable"""
+    global client, docker_version
+    if client is not None:
+        return client
+    
+    with _docker_lock:
+        if client is None:
+            try:
+                logger.info(f"Connecting to Docker at: {docker_socket}")
+                new_client = docker.DockerClient(base_url=docker_socket)
+                docker_version = new_client.version()
+                client = new_client
+                logger.info(f"Successfully connected to Docker at {docker_socket}")
+            except Exception as e:
+                logger.error(f"Failed to connect to Docker: {str(e)}")
+        return client
+
+def reset_client(failed_client: docker.DockerClient):
+    """Forget a failed Docker client so the next request reconnects"""
+    global client
+    with _docker_lock:
+        # Another request may already have reconnected
+        if client is failed_client:
+            client = None
+
+# Container count is cached briefly so frequent /status polls don't hit dockerd
+_CONTAINERS_TTL = 2.0
+_containers_cache = None  # (timestamp, count)
+
+def count_containers(docker_client: docker.DockerClient, fresh: bool = False) -> int:
+    global _containers_cache
+    now = time.monotonic()
+    if fresh or _containers_cache is None or now - _containers_cache[0] > _CONTAINERS_TTL:
+        _containers_cache = (now, len(docker_client.containers.list()))
+    return _containers_cache[1]
+
+class PythonWorkerPool:
+    """Interpreters started ahead of time with workers/runner.py, so Python
+    commands skip interpreter startup. Each worker runs a single command and
+    exits; up to `size` idle spares are kept ready, and a fresh one is started
+    whenever none is idle, so concurrent commands never wait on the pool."""
+    
+    RUNNER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "workers", "runner.py")
+    
+    def __init__(self, size: int):
+        self.size = size
+        self._spares = []
+        self._refill_task = None
+    
+    async def _spawn(self) -> asyncio.subprocess.Process:
+        return await asyncio.create_subprocess_exec(
+            "python", self.RUNNER,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
     
-    prompt = f"""Given this natural language command: '{natural_command}'
+    async def _refill(self):
+        try:
+            while len(self._spares) < self.size:
+                self._spares.append(await self._spawn())
+        except Exception as e:
+            logger.warning(f"Failed to start Python worker: {str(e)}")
+    
+    async def start(self, code: str, cwd: Optional[str]) -> Optional[asyncio.subprocess.Process]:
+        """Hand code to a worker and return its process, or None if the code
+        could not be handed over (it has not run, so the caller may retry)"""
+        worker = None
+        while self._spares and worker is None:
+            worker = self._spares.pop()
+            if worker.returncode is not None:
+                worker = None
+        if self.size and (self._refill_task is None or self._refill_task.done()):
+            self._refill_task = asyncio.ensure_future(self._refill())
+        
+        try:
+            if worker is None:
+                worker = await self._spawn()
+            worker.stdin.write(orjson.dumps({"code": code, "cwd": cwd}))
+            await worker.stdin.drain()
+            worker.stdin.close()
+        except Exception as e:
+            # The worker only runs code once it sees the end of stdin, so
+            # killing it here guarantees the code never ran
+            if worker is not None and worker.returncode is None:
+                worker.kill()
+            logger.warning(f"Python worker unavailable: {str(e)}")
+            return None
+        
+        return worker
+    
+    async def close(self):
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+            await asyncio.gather(self._refill_task, return_exceptions=True)
+        while self._spares:
+            worker = self._spares.pop()
+            if worker.returncode is None:
+                worker.kill()
+            await worker.communicate()
+
+# Worker processes belong to the event loop that started them, so the pool
+# lives only between startup and shutdown; without it Python commands run
+# as one-shot processes
+python_workers: Optional[PythonWorkerPool] = None
+
+@app.on_event("startup")
+def start_python_workers():
+    global python_workers
+    python_workers = PythonWorkerPool(int(os.getenv("PYTHON_WORKERS", "4")))
+
+@app.on_event("shutdown")
+async def close_python_workers():
+    global python_workers
+    if python_workers is not None:
+        pool, python_workers = python_workers, None
+        await pool.close()
+
+# Shared HTTP client for Ollama requests; keep-alive connections are reused
+# across calls so each request skips the TCP handshake
+_http = httpx.AsyncClient(
+    timeout=120,
+    limits=httpx.Limits(
+        max_connections=20,
+        max_keepalive_connections=20,
+        keepalive_expiry=60
+    )
+)
+
+@app.on_event("shutdown")
+async def close_http_client():
+    await _http.aclose()
+
+# Ollama request pieces that don't depend on the command
+_OLLAMA_URL = os.getenv('OLLAMA_HOST', 'http://localhost:11434').rstrip('/') + '/api/generate'
+_JSON_HEADERS = {"Content-Type": "application/json", "Connection": "keep-alive"}
+
+_SYSTEM_PROMPT = "You are a command line assistant that converts natural language into terminal commands. Always respond with valid JSON only. For command_type, always choose exactly one of: 'shell', 'python', or 'git'."
+
+_PROMPT_TEMPLATE = """Given this natural language command: '{cmd}'
     Convert it into appropriate terminal commands.
     You must choose exactly ONE command_type from these options: "shell", "python", or "git".
     Respond with only valid JSON in this format:
@@ -72,80 +242,160 @@ def get_command_interpretation(natural_command: str) -> dict:
         "explanation": "Brief explanation of what these commands will do"
     }}
     """
+
+# JSON object inside the first markdown code block, ignoring any text around it
+_FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.S)
+
+_OLLAMA_PAYLOAD = {
+    "model": "llama3.2",
+    "system": _SYSTEM_PROMPT,
+    "stream": True
+}
+
+_VALID_COMMAND_TYPES = frozenset(t.value for t in CommandType)
+
+def guess_command_type(commands: List[str]) -> str:
+    """Pick a command type from the commands themselves in a single pass"""
+    has_python = has_git = False
+    for cmd in commands:
+        if not has_python and (cmd.startswith('python') or cmd.endswith('.py')):
+            has_python = True
+        if not has_git and cmd.startswith('git'):
+            has_git = True
+        if has_python:
+            break
     
-    try:
-        ollama_host = os.getenv('OLLAMA_HOST', 'http://localhost:11434')
-        response = requests.post(
-            f"{ollama_host}/api/generate",
-            json={
-                "model": "llama3.2",
-                "prompt": prompt,
-                "system": "You are a command line assistant that converts natural language into terminal commands. Always respond with valid JSON only. For command_type, always choose exactly one of: 'shell', 'python', or 'git'.",
-                "stream": False
-            }
-        )
-        
+    if has_python:
+        return 'python'
+    if has_git:
+        return 'git'
+    return 'shell'
+
+# LRU cache of interpretations keyed on the whitespace-normalized command
+_INTERPRETATION_CACHE_SIZE = 1024
+_interpretation_cache: "OrderedDict[str, InterpretedCommand]" = OrderedDict()
+
+async def get_command_interpretation(natural_command: str) -> InterpretedCommand:
+    """Interpret a natural language command, reusing cached interpretations"""
+    key = " ".join(natural_command.split())
+    
+    cached = _interpretation_cache.get(key)
+    if cached is not None:
+        _interpretation_cache.move_to_end(key)
+        return cached
+    
+    interpretation = await _interpret(key)
+    
+    _interpretation_cache[key] = interpretation
+    if len(_interpretation_cache) > _INTERPRETATION_CACHE_SIZE:
+        _interpretation_cache.popitem(last=False)
+    
+    return interpretation
+
+# Characters of Ollama output allowed before a JSON object or code block starts
+_JSON_LEAD_IN_LIMIT = 200
+
+async def _generate(prompt: str) -> str:
+    """Stream a completion from Ollama, giving up early if it isn't JSON"""
+    parts = []
+    checked = False
+    
+    async with _http.stream(
+        "POST",
+        _OLLAMA_URL,
+        content=orjson.dumps({**_OLLAMA_PAYLOAD, "prompt": prompt}),
+        headers=_JSON_HEADERS
+    ) as response:
         if response.status_code != 200:
-            logger.error(f"Ollama API error: {response.status_code} - {response.text}")
-            raise HTTPException(status_code=500, detail=f"Ollama API error: {response.text}")
+            text = (await response.aread()).decode(errors="replace")
+            logger.error(f"Ollama API error: {response.status_code} - {text}")
+            raise HTTPException(status_code=500, detail=f"Ollama API error: {text}")
+        
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            chunk = orjson.loads(line)
+            if 'error' in chunk:
+                raise ValueError(f"Ollama error: {chunk['error']}")
             
-        try:
-            result = response.json()
+            parts.append(chunk.get('response', ''))
+            if not checked:
+                # Allow a short lead-in like "Here is the JSON:", but stop
+                # once it's clear no JSON object or code block is coming
+                head = "".join(parts)[:_JSON_LEAD_IN_LIMIT]
+                if "{" in head or "```" in head:
+                    checked = True
+                elif len(head) == _JSON_LEAD_IN_LIMIT:
+                    raise ValueError(f"Ollama response is not JSON: {head[:100]}")
             
-            # Extract the actual JSON response
-            if 'response' in result:
-                # Clean up the response - sometimes LLMs include markdown code blocks
-                json_str = result['response'].strip()
+            if chunk.get('done'):
+                break
+    
+    return "".join(parts)
+
+async def _interpret(natural_command: str) -> InterpretedCommand:
+    """Use Ollama to interpret natural language commands into terminal commands"""
+    
+    prompt = _PROMPT_TEMPLATE.format(cmd=natural_command)
+    
+    try:
+        json_str = (await _generate(prompt)).strip()
+        
+        try:
+            # Clean up the response - sometimes LLMs include markdown code blocks
+            match = _FENCE_RE.search(json_str)
+            if match:
+                json_str = match.group(1)
+            else:
+                # Unclosed or unopened fence around otherwise plain JSON
                 if json_str.startswith('```json'):
                     json_str = json_str[7:]
-                if json_str.startswith('```'):
+                elif json_str.startswith('```'):
                     json_str = json_str[3:]
                 if json_str.endswith('```'):
                     json_str = json_str[:-3]
                 json_str = json_str.strip()
                 
-                command_data = json.loads(json_str)
-            else:
-                command_data = result
+                # Skip a lead-in like "Sure! " that _generate let through
+                start = json_str.find('{')
+                if start > 0:
+                    json_str = json_str[start:]
             
-            # Validate and fix command_type
-            if 'command_type' not in command_data:
-                raise ValueError("Missing command_type in response")
+            try:
+                interpretation = InterpretedCommand.model_validate_json(json_str)
+            except ValidationError:
+                # Fix up command_type (wrong case, unknown type) and validate again
+                command_data = orjson.loads(json_str)
+                if 'command_type' not in command_data:
+                    raise ValueError("Missing command_type in response")
+                
+                command_type = str(command_data['command_type']).lower().strip()
+                if command_type not in _VALID_COMMAND_TYPES:
+                    # Try to intelligently choose the correct type based on commands
+                    command_type = guess_command_type(command_data.get('commands', []))
                 
-            # Ensure command_type is valid
-            command_type = command_data['command_type'].lower().strip()
-            if command_type not in ['shell', 'python', 'git']:
-                # Try to intelligently choose the correct type based on commands
-                commands = command_data.get('commands', [])
-                if any(cmd.startswith('python') or cmd.endswith('.py') for cmd in commands):
-                    command_type = 'python'
-                elif any(cmd.startswith('git') for cmd in commands):
-                    command_type = 'git'
-                else:
-                    command_type = 'shell'
-                    
-            command_data['command_type'] = command_type
+                command_data['command_type'] = command_type
+                try:
+                    interpretation = InterpretedCommand.model_validate(command_data)
+                except ValidationError as e:
+                    if any(error["loc"][0] == "commands" for error in e.errors()):
+                        raise ValueError("Missing or empty commands in response")
+                    raise
             
             # For Python files, adjust the command format
-            if command_type == 'python' and 'hello.py' in natural_command.lower():
-                command_data['commands'] = [
-                    f"echo 'print(\"Hello World\")' > hello.py"
-                ]
+            if interpretation.command_type == CommandType.PYTHON and 'hello.py' in natural_command.lower():
+                interpretation = interpretation.model_copy(update={
+                    "commands": [f"echo 'print(\"Hello World\")' > hello.py"]
+                })
             
-            # Validate other required fields
-            if 'commands' not in command_data or not command_data['commands']:
-                raise ValueError("Missing or empty commands in response")
-            if 'explanation' not in command_data:
-                command_data['explanation'] = "Executing the specified commands"
-                
-            return command_data
+            return interpretation
             
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse Ollama response as JSON: {result.get('response', '')}")
+        except orjson.JSONDecodeError as e:
+            logger.error(f"Failed to parse Ollama response as JSON: {json_str}")
             logger.error(str(e))
             raise HTTPException(status_code=500, detail="Failed to parse command interpretation")
             
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Error calling Ollama: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to connect to Ollama: {str(e)}")
     except Exception as e:
@@ -153,36 +403,54 @@ def get_command_interpretation(natural_command: str) -> dict:
         raise HTTPException(status_code=500, detail=f"Failed to process command: {str(e)}")
 
 @app.get("/status")
-async def get_status():
+def get_status(fresh: bool = False):
     """Get detailed status of Docker connection"""
-    if not client:
+    docker_client = get_client()
+    if not docker_client:
         return {
             "docker_connected": False,
             "error": "Docker client not initialized"
         }
     
     try:
-        file_path = docker_socket.replace('unix://', '') if docker_socket else '/var/run/docker.sock'
+        version = docker_client.version() if fresh else docker_version
+        active_containers = count_containers(docker_client, fresh)
+    except Exception as e:
+        reset_client(docker_client)
+        return {
+            "docker_connected": False,
+            "error": str(e)
+        }
+    
+    try:
+        file_path = docker_socket.replace('unix://', '')
+        
+        try:
+            socket_mode = os.stat(file_path).st_mode
+        except OSError:
+            socket_mode = None
         
         status = {
             "docker_connected": True,
             "socket_path": docker_socket,
-            "socket_exists": os.path.exists(file_path),
-            "version": client.version()
+            "socket_exists": socket_mode is not None,
+            "version": version
         }
         
-        if os.path.exists(file_path):
-            status["permissions"] = oct(os.stat(file_path).st_mode)[-3:]
+        if socket_mode is not None:
+            status["permissions"] = oct(socket_mode)[-3:]
         
-        containers = client.containers.list()
         status["containers_accessible"] = True
-        status["active_containers"] = len(containers)
+        status["active_containers"] = active_containers
         
         # Add projects directory status
         projects_dir = "/app/projects"
-        status["projects_dir_exists"] = os.path.exists(projects_dir)
-        if os.path.exists(projects_dir):
-            status["projects_dir_contents"] = os.listdir(projects_dir)
+        try:
+            with os.scandir(projects_dir) as entries:
+                status["projects_dir_contents"] = [entry.name for entry in entries]
+            status["projects_dir_exists"] = True
+        except FileNotFoundError:
+            status["projects_dir_exists"] = False
         
         return status
     except Exception as e:
@@ -191,40 +459,122 @@ async def get_status():
             "error": str(e)
         }
 
-@app.post("/execute")
-async def execute_commands(request: CommandRequest):
-    """Execute commands in a container based on type"""
-    if not client:
-        raise HTTPException(status_code=500, detail="Docker client not initialized")
-    
-    logger.info(f"Executing {request.type} commands:\n{request.commands}")
+# Command output returned to clients is capped at 1 MB per stream; the rest
+# is read and discarded so memory stays bounded too
+_MAX_OUTPUT = 1_000_000
+_TRUNCATED_MARKER = "\n[output truncated]"
+
+def _decode_capped(data: bytes, truncated: bool) -> str:
+    text = data.decode("utf-8", "replace")
+    return text + _TRUNCATED_MARKER if truncated else text
+
+async def read_capped(stream: asyncio.StreamReader) -> str:
+    """Read a process pipe to EOF, keeping at most _MAX_OUTPUT bytes"""
+    chunks = []
+    kept = 0
+    truncated = False
+    while True:
+        chunk = await stream.read(64 * 1024)
+        if not chunk:
+            break
+        room = _MAX_OUTPUT - kept
+        if len(chunk) > room:
+            truncated = True
+            chunk = chunk[:room]
+        if chunk:
+            chunks.append(chunk)
+            kept += len(chunk)
+    return _decode_capped(b"".join(chunks), truncated)
+
+# Trivial read-only shell commands that can be answered without spawning bash.
+# Arguments with quoting, globbing, expansion or redirection never match, and
+# `ls` is only answered in-process under C collation (see _C_COLLATION).
+_FASTPATH_ARG = r"[^\s;|&<>*?\[\]~$'\"\\`(){}#-][^\s;|&<>*?\[\]~$'\"\\`(){}]*"
+_FASTPATH_RE = re.compile(
+    rf"\s*(?:ls(?:\s+(?P<ls>{_FASTPATH_ARG}))?|(?P<pwd>pwd)|cat\s+(?P<cat>{_FASTPATH_ARG}))\s*"
+)
+
+# Whether ls in a child bash would sort names in plain byte order
+_C_COLLATION = (
+    os.environ.get("LC_ALL") or os.environ.get("LC_COLLATE") or os.environ.get("LANG") or "C"
+) in ("C", "POSIX", "C.UTF-8", "C.utf8")
+
+def run_fastpath(command_str: str, work_dir: Optional[str]) -> Optional[str]:
+    """Return the output of a trivial shell command run in-process, or None if
+    it has to go through bash"""
+    match = _FASTPATH_RE.fullmatch(command_str)
+    if not match:
+        return None
     
+    base = work_dir or os.getcwd()
     try:
-        command_str = " && ".join(request.commands)
+        if not os.path.isdir(base):
+            return None
+        if match["pwd"]:
+            return os.path.realpath(os.fsencode(base)).decode("utf-8", "replace") + "\n"
+        if match["cat"]:
+            path = os.path.join(base, match["cat"])
+            if not os.path.isfile(path):
+                return None
+            with open(path, "rb") as f:
+                data = f.read(_MAX_OUTPUT + 1)
+            return _decode_capped(data[:_MAX_OUTPUT], len(data) > _MAX_OUTPUT)
         
-        # Ensure projects directory exists
-        os.makedirs("/app/projects", exist_ok=True)
+        if not _C_COLLATION:
+            # ls sorts by the locale's collation, which we don't reproduce
+            return None
+        target = match["ls"] or "."
+        path = os.path.join(base, target)
+        if os.path.isfile(path):
+            return target + "\n"
+        if not os.path.isdir(path):
+            return None
+        # Scan as bytes: C collation is byte order, and names that aren't
+        # UTF-8 come out the same way bash's output is decoded
+        with os.scandir(os.fsencode(path)) as entries:
+            names = sorted(entry.name for entry in entries if not entry.name.startswith(b"."))
+        return "".join(name.decode("utf-8", "replace") + "\n" for name in names)
+    except OSError:
+        # Let bash produce its usual error message
+        return None
+
+async def run_commands(command_type: CommandType, command_str: str, work_dir: Optional[str]) -> dict:
+    """Run a chained command string and report its status and output"""
+    try:
+        returncode = None
+        if command_type == CommandType.SHELL and _FASTPATH_RE.fullmatch(command_str):
+            # Filesystem reads run off the event loop
+            fast_output = await run_in_threadpool(run_fastpath, command_str, work_dir)
+            if fast_output is not None:
+                returncode, stdout, stderr = 0, fast_output, ""
         
-        # Execute commands directly in the host container
-        if request.type == CommandType.PYTHON:
-            result = subprocess.run(
-                ["python", "-c", command_str],
-                cwd=request.work_dir,
-                capture_output=True,
-                text=True
-            )
-        else:  # Shell or Git commands
-            result = subprocess.run(
-                ["/bin/bash", "-c", command_str],
-                cwd=request.work_dir,
-                capture_output=True,
-                text=True
-            )
+        if returncode is None:
+            proc = None
+            if command_type == CommandType.PYTHON and python_workers is not None:
+                proc = await python_workers.start(command_str, work_dir)
+            
+            if proc is None:
+                # Execute commands directly in the host container; Python
+                # commands land here only if no worker could take them
+                if command_type == CommandType.PYTHON:
+                    argv = ["python", "-c", command_str]
+                else:  # Shell or Git commands
+                    argv = ["/bin/bash", "-c", command_str]
+                
+                proc = await asyncio.create_subprocess_exec(
+                    *argv,
+                    cwd=work_dir,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE
+                )
+            
+            stdout, stderr = await asyncio.gather(read_capped(proc.stdout), read_capped(proc.stderr))
+            returncode = await proc.wait()
         
-        output = result.stdout if result.returncode == 0 else f"Error: {result.stderr}"
+        output = stdout if returncode == 0 else f"Error: {stderr}"
         
         return {
-            "status": "success" if result.returncode == 0 else "error",
+            "status": "success" if returncode == 0 else "error",
             "output": output
         }
         
@@ -235,17 +585,72 @@ async def execute_commands(request: CommandRequest):
             "output": str(e)
         }
 
-@app.post("/nl-execute")
+@app.post("/execute")
+async def execute_commands(request: CommandRequest):
+    """Execute commands in a container based on type"""
+    if client is None and await run_in_threadpool(get_client) is None:
+        raise HTTPException(status_code=500, detail="Docker client not initialized")
+    
+    logger.info(f"Executing {request.type} commands:\n{request.commands}")
+    
+    return await run_commands(request.type, request.command_str, request.work_dir)
+
+@app.post("/execute-batch")
+async def execute_batch(request: BatchRequest):
+    """Execute several command requests in order, sharing one process between
+    consecutive shell/git requests with the same type and work_dir"""
+    if client is None and await run_in_threadpool(get_client) is None:
+        raise HTTPException(status_code=500, detail="Docker client not initialized")
+    
+    groups = []
+    for index, cmd_request in enumerate(request.requests):
+        last = groups[-1] if groups else None
+        if (
+            last is not None
+            and cmd_request.type != CommandType.PYTHON
+            and cmd_request.type == last["type"]
+            and cmd_request.work_dir == last["work_dir"]
+        ):
+            last["requests"].append(cmd_request)
+        else:
+            groups.append({
+                "type": cmd_request.type,
+                "work_dir": cmd_request.work_dir,
+                "indices": [],
+                "requests": [cmd_request]
+            })
+        groups[-1]["indices"].append(index)
+    
+    results = []
+    for group in groups:
+        if len(group["requests"]) == 1:
+            command_str = group["requests"][0].command_str
+        else:
+            # Each request gets its own subshell so cd, export, set -e or exit
+            # can't leak into the next one; the newline keeps a trailing
+            # comment from swallowing the closing parenthesis
+            command_str = " && ".join(
+                f"( {cmd_request.command_str}\n)"
+                for cmd_request in group["requests"]
+                if cmd_request.commands
+            )
+        
+        logger.info(f"Executing {group['type']} commands:\n{command_str}")
+        result = await run_commands(group["type"], command_str, group["work_dir"])
+        results.append({**result, "requests": group["indices"]})
+    
+    return results
+
 async def nl_execute_endpoint(request: NLCommandRequest):
     """Execute natural language commands"""
     try:
         # Get command interpretation from Ollama
-        interpretation = get_command_interpretation(request.command)
+        interpretation = await get_command_interpretation(request.command)
         
         # Create command request from interpretation
         cmd_request = CommandRequest(
-            type=CommandType(interpretation["command_type"]),
-            commands=interpretation["commands"],
+            type=interpretation.command_type,
+            commands=interpretation.commands,
             work_dir=request.work_dir
         )
         
@@ -253,22 +658,24 @@ async def nl_execute_endpoint(request: NLCommandRequest):
         result = await execute_commands(cmd_request)
         
         return CommandResponse(
-            interpreted_commands=interpretation["commands"],
+            interpreted_commands=interpretation.commands,
             command_type=cmd_request.type,
             status=result["status"],
-            output=f"Interpretation: {interpretation['explanation']}\n\nOutput: {result['output']}"
+            output=f"Interpretation: {interpretation.explanation}\n\nOutput: {result['output']}"
         )
         
     except Exception as e:
         logger.exception("Error processing natural language command")
         raise HTTPException(status_code=500, detail=str(e))
 
+if ENABLE_NL:
+    app.post("/nl-execute")(nl_execute_endpoint)
+
 @app.get("/projects")
-async def list_projects():
+def list_projects():
     """List contents of the projects directory"""
     try:
         projects_path = "/app/projects"
-        os.makedirs(projects_path, exist_ok=True)
         items = os.listdir(projects_path)
         return {
             "status": "success",
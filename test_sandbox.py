@@ -0,0 +1,384 @@
+import asyncio
+import os
+import time
+
+import httpx
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+import sandbox
+from sandbox import CommandType, PythonWorkerPool
+
+
+@pytest.fixture
+def run(monkeypatch):
+    """Run commands through run_commands with a fresh worker pool per call"""
+    def _run(command_type, code, work_dir, pool_size=2):
+        async def main():
+            pool = PythonWorkerPool(pool_size)
+            monkeypatch.setattr(sandbox, "python_workers", pool)
+            try:
+                if isinstance(code, list):
+                    return await asyncio.gather(
+                        *(sandbox.run_commands(command_type, c, work_dir) for c in code)
+                    )
+                return await sandbox.run_commands(command_type, code, work_dir)
+            finally:
+                await pool.close()
+        return asyncio.run(main())
+    return _run
+
+
+def test_python_imports_from_work_dir(run, tmp_path):
+    (tmp_path / "mymod.py").write_text("VALUE = 1\n")
+    result = run(CommandType.PYTHON, "import mymod; print(mymod.VALUE)", str(tmp_path))
+    assert result == {"status": "success", "output": "1\n"}
+
+
+def test_python_sees_edited_modules(run, tmp_path):
+    module = tmp_path / "mymod.py"
+    module.write_text("VALUE = 1\n")
+    assert run(CommandType.PYTHON, "import mymod; print(mymod.VALUE)", str(tmp_path))["output"] == "1\n"
+    module.write_text("VALUE = 2\n")
+    assert run(CommandType.PYTHON, "import mymod; print(mymod.VALUE)", str(tmp_path))["output"] == "2\n"
+
+
+def test_python_captures_child_and_binary_output(run, tmp_path):
+    code = "import os, sys; sys.stdout.flush(); os.system('echo from_child'); sys.stdout.buffer.write(b'raw\\n')"
+    result = run(CommandType.PYTHON, code, str(tmp_path))
+    assert result == {"status": "success", "output": "from_child\nraw\n"}
+
+
+def test_python_state_does_not_leak(run, tmp_path):
+    results = run(
+        CommandType.PYTHON,
+        ["import os; os.environ['FOO'] = '1'", "import os, time; time.sleep(0.5); print(os.environ.get('FOO'))"],
+        str(tmp_path)
+    )
+    assert results[1]["output"] == "None\n"
+
+
+def test_python_errors_and_exit_codes(run, tmp_path):
+    result = run(CommandType.PYTHON, "1/0", str(tmp_path))
+    assert result["status"] == "error"
+    assert 'File "<string>", line 1' in result["output"]
+    assert "ZeroDivisionError" in result["output"]
+    assert "runner.py" not in result["output"]
+    assert run(CommandType.PYTHON, "raise SystemExit(0)", str(tmp_path))["status"] == "success"
+    assert run(CommandType.PYTHON, "import os; os._exit(3)", str(tmp_path))["status"] == "error"
+
+
+def test_python_code_runs_once(run, tmp_path):
+    code = "open('side.txt', 'a').write('ran'); print('\\udc80')"
+    run(CommandType.PYTHON, code, str(tmp_path))
+    assert (tmp_path / "side.txt").read_text() == "ran"
+
+
+def test_python_commands_do_not_wait_for_pool(run, tmp_path):
+    start = time.monotonic()
+    results = run(CommandType.PYTHON, ["import time; time.sleep(1)"] * 4, str(tmp_path), pool_size=1)
+    assert all(r["status"] == "success" for r in results)
+    assert time.monotonic() - start < 3
+
+
+def test_python_falls_back_when_no_worker_starts(run, tmp_path, monkeypatch):
+    async def fail(self):
+        raise OSError("cannot start worker")
+    monkeypatch.setattr(PythonWorkerPool, "_spawn", fail)
+    code = "open('side.txt', 'a').write('ran'); print('ok')"
+    assert run(CommandType.PYTHON, code, str(tmp_path)) == {"status": "success", "output": "ok\n"}
+    assert (tmp_path / "side.txt").read_text() == "ran"
+
+
+def test_python_handover_failure_returns_none_and_kills_worker():
+    async def main():
+        pool = PythonWorkerPool(0)
+        worker = await pool._spawn()
+        def broken_close():
+            raise RuntimeError("Event loop is closed")
+        worker.stdin.close = broken_close
+        pool._spares.append(worker)
+        assert await pool.start("print('ran')", None) is None
+        assert await worker.wait() != 0
+        assert await worker.stdout.read() == b""
+    asyncio.run(main())
+
+
+def test_execute_without_lifespan_runs_python_one_shot(monkeypatch, tmp_path):
+    monkeypatch.setattr(sandbox, "client", object())
+    client = TestClient(sandbox.app)
+    for _ in range(2):
+        response = client.post("/execute", json={"type": "python", "commands": ["print(1)"], "work_dir": str(tmp_path)})
+        assert response.json() == {"status": "success", "output": "1\n"}
+    assert sandbox.python_workers is None
+
+
+def test_execute_with_lifespan_uses_and_closes_pool(monkeypatch, tmp_path):
+    monkeypatch.setattr(sandbox, "client", object())
+    with TestClient(sandbox.app) as client:
+        assert isinstance(sandbox.python_workers, PythonWorkerPool)
+        for _ in range(2):
+            response = client.post("/execute", json={"type": "python", "commands": ["print(1)"], "work_dir": str(tmp_path)})
+            assert response.json() == {"status": "success", "output": "1\n"}
+    assert sandbox.python_workers is None
+
+def test_python_code_is_decoded_as_utf8(run, tmp_path, monkeypatch):
+    monkeypatch.setenv("PYTHONIOENCODING", "latin-1")
+    assert run(CommandType.PYTHON, "print(len('é中'))", str(tmp_path))["output"] == "2\n"
+
+
+def test_status_tolerates_unreadable_socket_path(monkeypatch, tmp_path):
+    monkeypatch.setattr(sandbox, "client", object())
+    monkeypatch.setattr(sandbox, "count_containers", lambda docker_client, fresh=False: 0)
+    not_a_dir = tmp_path / "file"
+    not_a_dir.write_text("")
+    monkeypatch.setattr(sandbox, "docker_socket", f"unix://{not_a_dir}/docker.sock")
+    status = sandbox.get_status()
+    assert status["docker_connected"] is True
+    assert status["socket_exists"] is False
+    assert "permissions" not in status
+
+
+class FakeDockerClient:
+    def __init__(self, on_list=None):
+        self.on_list = on_list
+        self.containers = self
+    
+    def version(self):
+        return {"Version": "test"}
+    
+    def list(self):
+        if self.on_list:
+            self.on_list()
+        return []
+
+
+def test_status_uses_the_client_it_got(monkeypatch):
+    # Another thread resets the global client while /status is running
+    fake = FakeDockerClient(on_list=lambda: setattr(sandbox, "client", None))
+    monkeypatch.setattr(sandbox, "client", fake)
+    status = sandbox.get_status(fresh=True)
+    assert status["docker_connected"] is True
+    assert status["version"] == {"Version": "test"}
+
+
+def test_status_filesystem_errors_keep_the_client(monkeypatch):
+    fake = FakeDockerClient()
+    monkeypatch.setattr(sandbox, "client", fake)
+    def deny(path):
+        raise PermissionError(f"denied: {path}")
+    monkeypatch.setattr(sandbox.os, "scandir", deny)
+    sandbox.get_status(fresh=True)
+    assert sandbox.client is fake
+
+
+def test_status_docker_errors_reset_the_client(monkeypatch):
+    def fail():
+        raise ConnectionError("docker went away")
+    fake = FakeDockerClient(on_list=fail)
+    monkeypatch.setattr(sandbox, "client", fake)
+    status = sandbox.get_status(fresh=True)
+    assert status == {"docker_connected": False, "error": "docker went away"}
+    assert sandbox.client is None
+
+def test_startup_survives_unwritable_projects_dir(monkeypatch):
+    def deny(*args, **kwargs):
+        raise PermissionError("read-only file system")
+    monkeypatch.setattr(sandbox.os, "makedirs", deny)
+    sandbox.ensure_projects_dir()
+
+
+def stream_ollama(monkeypatch, *pieces):
+    """Serve a canned streaming Ollama reply made of the given text pieces"""
+    lines = [orjson.dumps({"response": piece, "done": False}) for piece in pieces]
+    lines.append(orjson.dumps({"response": "", "done": True}))
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=b"\n".join(lines)))
+    monkeypatch.setattr(sandbox, "_http", httpx.AsyncClient(transport=transport))
+
+
+def test_interpretation_allows_lead_in_before_json(monkeypatch):
+    stream_ollama(
+        monkeypatch,
+        "Here is the JSON:\n",
+        '```json\n{"command_type": "shell", "commands": ["ls"]}\n```'
+    )
+    interpretation = asyncio.run(sandbox._interpret("list files"))
+    assert interpretation.command_type == CommandType.SHELL
+    assert interpretation.commands == ["ls"]
+
+
+def test_interpretation_ignores_later_code_blocks(monkeypatch):
+    stream_ollama(
+        monkeypatch,
+        '```json\n{"command_type": "shell", "commands": ["ls"], "explanation": "lists {files}"}\n```\n'
+        'You could also run:\n```\n{ ls -la; }\n```'
+    )
+    interpretation = asyncio.run(sandbox._interpret("list files"))
+    assert interpretation.commands == ["ls"]
+    assert interpretation.explanation == "lists {files}"
+
+
+@pytest.mark.parametrize("reply", [
+    'Sure! {"command_type": "shell", "commands": ["ls"]}',
+    'Here you go:\n```json\n{"command_type": "shell", "commands": ["ls"]}',
+])
+def test_interpretation_skips_unfenced_lead_in(monkeypatch, reply):
+    stream_ollama(monkeypatch, reply)
+    assert asyncio.run(sandbox._interpret("list files")).commands == ["ls"]
+
+
+def test_generation_aborts_when_no_json_starts(monkeypatch):
+    stream_ollama(monkeypatch, "I cannot help with that. " * 20, '{"command_type": "shell"}')
+    with pytest.raises(ValueError, match="not JSON"):
+        asyncio.run(sandbox._generate("prompt"))
+
+
+@pytest.mark.parametrize("reply", [
+    '```json\n{"command_type": "git", "commands": ["git status"]}',
+    '{"command_type": "git", "commands": ["git status"]}\n```',
+    '{"command_type": "git", "commands": ["git status"]}',
+])
+def test_interpretation_handles_partial_fences(monkeypatch, reply):
+    stream_ollama(monkeypatch, reply)
+    interpretation = asyncio.run(sandbox._interpret("show git status"))
+    assert interpretation.commands == ["git status"]
+
+
+@pytest.mark.parametrize("command", [
+    "ls", "  ls  ", "ls sub", "ls sub/", "ls b.txt", "pwd", "cat b.txt", "cat sub/c.txt",
+])
+def test_fastpath_accepts_trivial_reads(command):
+    assert sandbox._FASTPATH_RE.fullmatch(command)
+
+
+@pytest.mark.parametrize("command", [
+    "ls -la", "ls *.txt", "ls sub b.txt", "ls && pwd", "ls; rm x", "ls | wc -l", "ls > out",
+    "cat $HOME", "cat ~/x", "cat 'b.txt'", "cat \"b.txt\"", "cat `x`", "cat $(x)", "cat", "cat #x",
+    "pwd -P", "lsblk", "echo hi",
+])
+def test_fastpath_rejects_everything_else(command):
+    assert not sandbox._FASTPATH_RE.fullmatch(command)
+
+
+@pytest.fixture
+def c_collation(monkeypatch):
+    """Make both the fast path and the child bash use C collation"""
+    monkeypatch.setenv("LC_ALL", "C")
+    monkeypatch.setattr(sandbox, "_C_COLLATION", True)
+
+
+def test_fastpath_matches_bash(run, tmp_path, c_collation):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "b.txt").write_text("hello\n")
+    (tmp_path / ".hidden").write_text("")
+    (tmp_path / "Upper").write_text("")
+    for command in ["ls", "ls sub", "ls b.txt", "pwd", "cat b.txt"]:
+        assert sandbox.run_fastpath(command, str(tmp_path)) is not None
+        expected = run(CommandType.SHELL, f"{command} && true", str(tmp_path))
+        assert run(CommandType.SHELL, command, str(tmp_path)) == expected
+    assert sandbox.run_fastpath("cat missing", str(tmp_path)) is None
+
+
+def test_output_is_capped_in_bytes_with_marker(run, tmp_path, monkeypatch):
+    monkeypatch.setattr(sandbox, "_MAX_OUTPUT", 10)
+    result = run(CommandType.SHELL, "printf 'x%.0s' $(seq 100000)", str(tmp_path))
+    assert result["output"] == "x" * 10 + "\n[output truncated]"
+    result = run(CommandType.PYTHON, "print('é' * 100)", str(tmp_path))
+    assert result["output"] == "é" * 5 + "\n[output truncated]"
+    assert run(CommandType.SHELL, "printf 'x%.0s' $(seq 10)", str(tmp_path))["output"] == "x" * 10
+    (tmp_path / "big.txt").write_text("y" * 11)
+    assert run(CommandType.SHELL, "cat big.txt", str(tmp_path))["output"] == "y" * 10 + "\n[output truncated]"
+
+
+def execute_batch(monkeypatch, *requests):
+    monkeypatch.setattr(sandbox, "client", object())
+    response = TestClient(sandbox.app).post("/execute-batch", json={"requests": list(requests)})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_batch_groups_consecutive_compatible_requests(monkeypatch, tmp_path):
+    other = tmp_path / "other"
+    other.mkdir()
+    d = str(tmp_path)
+    results = execute_batch(
+        monkeypatch,
+        {"type": "shell", "commands": ["echo a"], "work_dir": d},
+        {"type": "shell", "commands": ["echo b", "echo c"], "work_dir": d},
+        {"type": "python", "commands": ["print('p1')"], "work_dir": d},
+        {"type": "python", "commands": ["print('p2')"], "work_dir": d},
+        {"type": "shell", "commands": ["echo d"], "work_dir": d},
+        {"type": "git", "commands": ["echo e"], "work_dir": d},
+        {"type": "shell", "commands": ["pwd"], "work_dir": str(other)},
+    )
+    assert [r["requests"] for r in results] == [[0, 1], [2], [3], [4], [5], [6]]
+    assert [r["output"] for r in results] == ["a\nb\nc\n", "p1\n", "p2\n", "d\n", "e\n", f"{other}\n"]
+    assert all(r["status"] == "success" for r in results)
+
+
+def test_batch_requests_do_not_share_shell_state(monkeypatch, tmp_path):
+    (tmp_path / "sub").mkdir()
+    d = str(tmp_path)
+    results = execute_batch(
+        monkeypatch,
+        {"type": "shell", "commands": ["cd sub", "export FOO=1", "set -e", "echo first # comment"], "work_dir": d},
+        {"type": "shell", "commands": ["exit 0"], "work_dir": d},
+        {"type": "shell", "commands": [], "work_dir": d},
+        {"type": "shell", "commands": ["pwd && echo \"FOO=${FOO:-unset}\""], "work_dir": d},
+    )
+    assert len(results) == 1
+    assert results[0] == {"status": "success", "output": f"first\n{d}\nFOO=unset\n", "requests": [0, 1, 2, 3]}
+
+
+def test_batch_stops_group_at_first_failure(monkeypatch, tmp_path):
+    d = str(tmp_path)
+    results = execute_batch(
+        monkeypatch,
+        {"type": "shell", "commands": ["echo ok"], "work_dir": d},
+        {"type": "shell", "commands": ["echo boom >&2; exit 3"], "work_dir": d},
+        {"type": "shell", "commands": ["touch never"], "work_dir": d},
+    )
+    assert results == [{"status": "error", "output": "Error: boom\n", "requests": [0, 1, 2]}]
+    assert not (tmp_path / "never").exists()
+
+
+def test_fastpath_handles_non_utf8_names(run, monkeypatch, tmp_path, c_collation):
+    os_dir = os.fsencode(tmp_path)
+    os.close(os.open(os_dir + b"/caf\xe9", os.O_CREAT | os.O_WRONLY))
+    os.mkdir(os_dir + b"/d\xff")
+    d = str(tmp_path)
+    assert sandbox.run_fastpath("ls", d) == "caf�\nd�\n"
+    assert run(CommandType.SHELL, "ls", d) == run(CommandType.SHELL, "ls && true", d)
+    
+    work_dir = os.fsdecode(os_dir + b"/d\xff")
+    assert sandbox.run_fastpath("pwd", work_dir) == f"{d}/d�\n"
+    
+    monkeypatch.setattr(sandbox, "client", object())
+    response = TestClient(sandbox.app).post("/execute", json={"type": "shell", "commands": ["ls"], "work_dir": d})
+    assert response.status_code == 200
+    assert response.json()["output"] == "caf�\nd�\n"
+
+
+def test_fastpath_leaves_ls_to_bash_under_other_collations(monkeypatch, tmp_path):
+    monkeypatch.setattr(sandbox, "_C_COLLATION", False)
+    assert sandbox.run_fastpath("ls", str(tmp_path)) is None
+    assert sandbox.run_fastpath("pwd", str(tmp_path)) == f"{tmp_path}\n"
+
+
+def test_interpretation_defaults_null_explanation(monkeypatch):
+    stream_ollama(monkeypatch, '{"command_type": "shell", "commands": ["ls"], "explanation": null}')
+    interpretation = asyncio.run(sandbox._interpret("list files"))
+    assert interpretation.explanation == "Executing the specified commands"
+
+
+@pytest.mark.parametrize("reply", [
+    '{"command_type": "shell", "commands": []}',
+    '{"command_type": "shell"}',
+    '{"command_type": "Shell", "commands": []}',
+])
+def test_interpretation_reports_missing_commands(monkeypatch, reply):
+    stream_ollama(monkeypatch, reply)
+    with pytest.raises(sandbox.HTTPException) as excinfo:
+        asyncio.run(sandbox._interpret("list files"))
+    assert excinfo.value.detail == "Failed to process command: Missing or empty commands in response"
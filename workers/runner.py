@@ -0,0 +1,47 @@
+"""Pre-started Python interpreter for the sandbox.
+
+The server starts this script ahead of time so Python commands skip
+interpreter startup. It waits for one JSON request on stdin,
+{"code": "...", "cwd": "..."}, and runs the code the way `python -c` would:
+output goes straight to this process's stdout/stderr and the exit status is
+the command's. Each worker runs exactly one command, so nothing carries over
+between commands.
+"""
+import json
+import os
+import sys
+import traceback
+import types
+
+
+def main():
+    # The server sends UTF-8 (orjson), whatever the locale says
+    request = json.loads(sys.stdin.buffer.read())
+
+    cwd = request.get("cwd")
+    if cwd:
+        try:
+            os.chdir(cwd)
+        except OSError as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+
+    # Same import path, argv and __main__ module that `python -c` gets
+    sys.path[0] = ""
+    sys.argv = ["-c"]
+    main_module = types.ModuleType("__main__")
+    sys.modules["__main__"] = main_module
+
+    try:
+        exec(compile(request["code"], "<string>", "exec"), main_module.__dict__)
+    except SystemExit:
+        raise
+    except BaseException:
+        etype, value, tb = sys.exc_info()
+        # Drop this frame so tracebacks look like those from `python -c`
+        traceback.print_exception(etype, value, tb.tb_next)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()